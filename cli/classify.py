@@ -3,11 +3,11 @@ from pathlib import Path
 import os
 import time
 
-import pandas as pd
 from dotenv import load_dotenv
 
-from src.config.settings import load_config_from_env
-from src.io.loader import load_dataset
+from src.config.settings import load_config_from_env, parse_langs
+from src.io.loader import load_dataset, save_dataset
+from src.models.openai_client import add_usage
 from src.processing.translate import translate_problems
 from src.processing.classify import classify_dataframe, ClassificationParams
 from src.processing.postprocess import add_wide_columns
@@ -28,7 +28,7 @@ def main():
     if not os.getenv("OPENAI_API_KEY"):
         raise SystemExit("OPENAI_API_KEY is required. Set it in .env, ENV, or pass via environment.")
 
-    langs = [x.strip() for x in args.langs.split(",") if x.strip()]
+    langs = parse_langs(args.langs)
     if not langs or len(langs) > 2:
         raise SystemExit("--langs must specify 1 or 2 ISO codes, e.g.: --langs en,sw")
 
@@ -75,15 +75,11 @@ def main():
         out_path = in_path.with_name(in_path.stem + "_classified.csv")
     print("[4/4] Сохранение результата...")
     t6 = time.time()
-    df_cls.to_csv(out_path, index=False, encoding="utf-8-sig", sep=";")
+    save_dataset(df_cls, out_path)
     t7 = time.time()
     print(f"[4/4] Готово за {t7 - t6:.2f} c | Файл: {out_path}")
 
-    total_tokens = {
-        "prompt_tokens": usage_translate.get("prompt_tokens", 0) + usage_classify.get("prompt_tokens", 0),
-        "completion_tokens": usage_translate.get("completion_tokens", 0) + usage_classify.get("completion_tokens", 0),
-        "total_tokens": usage_translate.get("total_tokens", 0) + usage_classify.get("total_tokens", 0),
-    }
+    total_tokens = add_usage(dict(usage_translate), usage_classify)
     print(f"ИТОГО токены: {total_tokens}")
 
 
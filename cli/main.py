@@ -4,8 +4,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from src.config.settings import load_config_from_env
+from src.config.settings import load_config_from_env, parse_langs
 from src.io.loader import load_dataset
+from src.models.openai_client import add_usage
 from src.processing.assemble_data import assemble_problems
 from src.processing.generate import generate_section
 from src.processing.edit import edit_section
@@ -60,7 +61,7 @@ def main():
         t2 = time.time()
         if not args.langs:
             raise SystemExit("--auto-classify requires --langs (1-2 ISO codes), e.g.: --langs en,sw")
-        langs = [x.strip() for x in args.langs.split(",") if x.strip()]
+        langs = parse_langs(args.langs)
         if not langs or len(langs) > 2:
             raise SystemExit("--langs must specify 1 or 2 ISO codes, e.g.: --langs en,sw")
 
@@ -80,12 +81,12 @@ def main():
         df, usage_cl = classify_dataframe(cfg, df, cols["message"], ru_list, translations, langs, params)
         # refresh detected columns after classification
         from src.io.loader import _detect_column
-        cols["problem_ru"] = _detect_column(df, ["problem_russ", "problem_ru"]) or "problem_russ"
+        cols["problem_ru"] = _detect_column(set(df.columns), ["problem_russ", "problem_ru"]) or "problem_russ"
         t3 = time.time()
         print(f"[2/6] Готово за {t3 - t2:.2f} c | токены перевод={usage_tr}, классификация={usage_cl}")
 
     # Assemble messages per problem
-    problems_ordered, groups = assemble_problems(
+    problems_ordered, groups, merged_labels = assemble_problems(
         df,
         cols,
         cfg.max_messages_per_problem,
@@ -95,16 +96,24 @@ def main():
 
     # Generate sections (minimal path; no editor yet)
     sections = []
-    total_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-
-    def process_section(problem_key: str, group: dict):
+    total_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+
+    def section_error(problem_key: str, group: dict, e: Exception):
+        return {
+            "title": group.get('problem_ru') or problem_key,
+            "blocks": [{"type": "paragraph", "text": f"Не удалось получить анализ. Ошибка: {e}"}],
+        }
+
+    def generate_stage(problem_key: str, group: dict):
+        print(f"[3/6] Генерация раздела: {problem_key}...")
+        tg0 = time.time()
+        raw_text, u_gen = generate_section(cfg, cfg.country, problem_key, group)
+        tg1 = time.time()
+        print(f"[3/6] Генерация ок за {tg1 - tg0:.2f} c | токены {u_gen}")
+        return raw_text, u_gen
+
+    def edit_stage(problem_key: str, group: dict, raw_text: str, u_gen: dict):
         try:
-            print(f"[3/6] Генерация раздела: {problem_key}...")
-            tg0 = time.time()
-            raw_text, u_gen = generate_section(cfg, cfg.country, problem_key, group)
-            tg1 = time.time()
-            print(f"[3/6] Генерация ок за {tg1 - tg0:.2f} c | токены {u_gen}")
-
             print(f"[4/6] Редактирование раздела: {problem_key}...")
             te0 = time.time()
             text, u_edit = edit_section(cfg, cfg.country, raw_text, group.get("links", []))
@@ -120,45 +129,54 @@ def main():
             if not blocks:
                 blocks = [{"type": "paragraph", "text": text}]
             section = {"title": section_title, "blocks": blocks}
-            usage = {
-                "prompt_tokens": u_gen.get("prompt_tokens", 0) + u_edit.get("prompt_tokens", 0),
-                "completion_tokens": u_gen.get("completion_tokens", 0) + u_edit.get("completion_tokens", 0),
-                "total_tokens": u_gen.get("total_tokens", 0) + u_edit.get("total_tokens", 0),
-            }
+            usage = add_usage(dict(u_gen), u_edit)
             return section, usage
         except Exception as e:
-            section = {
-                "title": group.get('problem_ru') or problem_key,
-                "blocks": [{"type": "paragraph", "text": f"Не удалось получить анализ. Ошибка: {e}"}],
-            }
-            return section, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            # Generation tokens are already spent, keep them in the totals
+            return section_error(problem_key, group, e), u_gen
+
+    def process_section(problem_key: str, group: dict):
+        try:
+            raw_text, u_gen = generate_stage(problem_key, group)
+        except Exception as e:
+            return section_error(problem_key, group, e), {}
+        return edit_stage(problem_key, group, raw_text, u_gen)
+
+    def collect(section: dict, usage: dict):
+        sections.append(section)
+        add_usage(total_usage, usage)
 
     if args.concurrency and args.concurrency > 1:
         print(f"Параллельная генерация с concurrency={args.concurrency} ...")
-        with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
-            future_to_key = {ex.submit(process_section, p, groups.get(p)): p for p in problems_ordered if groups.get(p)}
-            for fut in as_completed(future_to_key):
-                section, usage = fut.result()
-                sections.append(section)
-                total_usage["prompt_tokens"] += usage["prompt_tokens"]
-                total_usage["completion_tokens"] += usage["completion_tokens"]
-                total_usage["total_tokens"] += usage["total_tokens"]
+        # A pool per stage, each with `concurrency` workers: at most that many generate
+        # and that many edit calls are in flight. Each section's edit is submitted as
+        # soon as its generation finishes and does not queue behind pending generations.
+        with ThreadPoolExecutor(max_workers=args.concurrency) as gen_ex, \
+                ThreadPoolExecutor(max_workers=args.concurrency) as edit_ex:
+            gen_futures = {gen_ex.submit(generate_stage, p, groups.get(p)): p for p in problems_ordered if groups.get(p)}
+            edit_futures = []
+            for fut in as_completed(gen_futures):
+                p = gen_futures[fut]
+                try:
+                    raw_text, u_gen = fut.result()
+                except Exception as e:
+                    collect(section_error(p, groups[p], e), {})
+                    continue
+                edit_futures.append(edit_ex.submit(edit_stage, p, groups[p], raw_text, u_gen))
+            for fut in as_completed(edit_futures):
+                collect(*fut.result())
     else:
         for p in problems_ordered:
             g = groups.get(p)
             if not g:
                 continue
-            section, usage = process_section(p, g)
-            sections.append(section)
-            total_usage["prompt_tokens"] += usage["prompt_tokens"]
-            total_usage["completion_tokens"] += usage["completion_tokens"]
-            total_usage["total_tokens"] += usage["total_tokens"]
+            collect(*process_section(p, g))
 
     # Build distribution table (RU (EN)) excluding 'нет'
     from src.processing.assemble_data import build_distribution
     print("[5/6] Подготовка таблицы распределения проблем...")
     td0 = time.time()
-    distribution = build_distribution(df, cols)
+    distribution = build_distribution(df, cols, merged_labels)
     td1 = time.time()
     print(f"[5/6] Готово за {td1 - td0:.2f} c")
 
@@ -8,6 +8,7 @@ class ModelsConfig:
     classify: str
     generate: str
     editor: str
+    classify_concurrency: int = 16  # parallel classification requests
 
 
 @dataclass
@@ -23,6 +24,11 @@ class AppConfig:
     models: ModelsConfig
 
 
+def parse_langs(value: str | None) -> list[str]:
+    """Parse a comma-separated list of ISO 639-1 codes, e.g. "en, sw" -> ["en", "sw"]."""
+    return [x.strip() for x in (value or "").split(",") if x.strip()]
+
+
 def load_config_from_env(country: str | None = None) -> AppConfig:
     """Build configuration using environment variables with sane defaults.
     CLI can pass `country` to override.
@@ -31,6 +37,7 @@ def load_config_from_env(country: str | None = None) -> AppConfig:
         classify=os.getenv("OPENAI_MODEL_CLASSIFY", os.getenv("OPENAI_MODEL", "gpt-4.1-mini")),
         generate=os.getenv("OPENAI_MODEL_GENERATE", os.getenv("OPENAI_MODEL", "gpt-4.1")),
         editor=os.getenv("OPENAI_MODEL_EDITOR", os.getenv("OPENAI_MODEL", "gpt-4.1")),
+        classify_concurrency=int(os.getenv("OPENAI_CLASSIFY_CONCURRENCY", "16")),
     )
 
     return AppConfig(
@@ -41,10 +48,8 @@ def load_config_from_env(country: str | None = None) -> AppConfig:
         temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.2")),
         max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "5000")),
         on_missing_facts=os.getenv("ON_MISSING_FACTS", "skip"),
-        output_basename=os.getenv(
-            "OUTPUT_BASENAME",
-            f"problems_report_{datetime.now().strftime('%Y%m%d_%H%M')}"
-        ),
+        # timestamp is formatted only when OUTPUT_BASENAME is not set
+        output_basename=os.getenv("OUTPUT_BASENAME") or f"problems_report_{datetime.now():%Y%m%d_%H%M}",
         models=models,
     )
 
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+CACHE_DB = Path("cache") / "cache.sqlite"
+
+# sqlite's default limit on bound parameters is 999 in older builds
+_SELECT_CHUNK = 900
+
+
+class KVCache:
+    """Persistent key -> JSON value store on sqlite, one table per namespace.
+
+    Lookups and writes touch only the requested keys, so a run costs the same
+    whatever the cache size. Use from a single thread; writes are committed
+    every `commit_every` rows and on close.
+    """
+
+    def __init__(self, namespace: str, path: Path | str = CACHE_DB, commit_every: int = 200):
+        if not namespace.isidentifier():
+            raise ValueError(f"Bad cache namespace: {namespace!r}")
+        self.table = namespace
+        self.commit_every = max(1, commit_every)
+        self._pending = 0
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(path))
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        except (OSError, sqlite3.Error):
+            # Unwritable location: keep working with a cache for this run only
+            self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found: Dict[str, Any] = {}
+        for start in range(0, len(keys), _SELECT_CHUNK):
+            chunk = keys[start:start + _SELECT_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT key, value FROM {self.table} WHERE key IN ({marks})", chunk)
+            for key, value in rows:
+                found[key] = json.loads(value)
+        return found
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+            (key, json.dumps(value, ensure_ascii=False)),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "KVCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import csv
 from pathlib import Path
 import pandas as pd
 
 
-PROBLEM_COL_CANDIDATES = ["проблема", "problem", "Проблема"]
+# All candidates are matched exactly first, then case-insensitively
+PROBLEM_COL_CANDIDATES = ["проблема", "problem"]
 PROBLEM_RU_COL_CANDIDATES = [
     "problem_russ",
     "problem_rus",  # common variant with single 's'
@@ -16,42 +18,120 @@ PROBLEM_RU_COL_CANDIDATES = [
     "проблема (ru)",
     "перевод_проблемы",
 ]
-MESSAGE_COL_CANDIDATES = ["Сообщение", "Сообщения", "сообщение", "text", "Текст"]
+MESSAGE_COL_CANDIDATES = ["Сообщение", "Сообщения", "text", "Текст"]
 
 
-def _detect_column(df: pd.DataFrame, candidates: list[str]) -> str | None:
+def _lower_map(columns) -> dict[str, str]:
+    """Lowercased name -> first column with that name."""
+    lower_map: dict[str, str] = {}
+    for c in columns:
+        lower_map.setdefault(str(c).lower(), c)
+    return lower_map
+
+
+def _detect_column(
+    col_set: set[str],
+    candidates: list[str],
+    lower_map: dict[str, str] | None = None,
+) -> str | None:
+    # Exact names first, for all candidates; only then a case-insensitive pass
     for col in candidates:
-        if col in df.columns:
+        if col in col_set:
             return col
+    if lower_map is None:
+        lower_map = _lower_map(col_set)
+    for col in candidates:
+        found = lower_map.get(col.lower())
+        if found is not None:
+            return found
     return None
 
 
+def _sniff_sep(path: Path) -> str:
+    """Pick ';' or ',' by counting them in the header line."""
+    with open(path, "rb") as f:
+        head = f.read(4096).decode("utf-8-sig", errors="ignore")
+    first_line = head.splitlines()[0] if head else ""
+    return ";" if first_line.count(";") >= first_line.count(",") else ","
+
+
+def _read_csv_pandas(path: Path, sep: str) -> pd.DataFrame:
+    return pd.read_csv(path, sep=sep, encoding="utf-8-sig", on_bad_lines="skip")
+
+
+def _read_csv(path: Path, sep: str) -> pd.DataFrame:
+    """Read CSV with pyarrow's multi-threaded reader (Arrow-backed dtypes), pandas as fallback.
+
+    As with pandas, rows with too many fields are skipped and dates/times stay
+    strings. Files that pyarrow reads differently from pandas go to pandas
+    instead: rows with too few fields (pandas pads them with NaN) and repeated or
+    empty header names (pandas renames them to 'Ссылка.1', 'Unnamed: 3').
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        return _read_csv_pandas(path, sep)
+
+    short_rows: list[int] = []
+
+    def on_invalid_row(row) -> str:
+        if row.actual_columns < row.expected_columns:
+            short_rows.append(row.number)
+        return "skip"
+
+    parse_options = pa_csv.ParseOptions(
+        delimiter=sep,
+        # messages often contain line breaks inside quoted values
+        newlines_in_values=True,
+        invalid_row_handler=on_invalid_row,
+    )
+    try:
+        table = pa_csv.read_csv(
+            path, parse_options=parse_options, convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+        )
+        names = table.column_names
+        if short_rows or len(set(names)) != len(names) or "" in names:
+            return _read_csv_pandas(path, sep)
+        # pyarrow infers dates/times/timestamps, pandas keeps them as text: re-read those columns as strings
+        temporal = {f.name: pa.string() for f in table.schema if pa.types.is_temporal(f.type)}
+        if temporal:
+            table = pa_csv.read_csv(
+                path,
+                parse_options=parse_options,
+                convert_options=pa_csv.ConvertOptions(strings_can_be_null=True, column_types=temporal),
+            )
+    except pa.ArrowInvalid:
+        return _read_csv_pandas(path, sep)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
 def load_dataset(input_path: str | Path, require_problem: bool = True) -> tuple[pd.DataFrame, dict]:
     path = Path(input_path)
     if not path.exists():
         raise FileNotFoundError(f"Input not found: {path}")
 
-    # Try ; then ,
-    try:
-        df = pd.read_csv(path, sep=";", encoding="utf-8-sig", on_bad_lines="skip")
-    except Exception:
-        df = pd.read_csv(path, sep=",", encoding="utf-8-sig", on_bad_lines="skip")
+    df = _read_csv(path, _sniff_sep(path))
+
+    col_set = set(df.columns)
+    lower_map = _lower_map(df.columns)
 
-    if "Заголовок" in df.columns:
-        df = df.drop_duplicates(subset=["Заголовок"]).reset_index(drop=True)
+    if "Заголовок" in col_set:
+        # ignore_index renumbers rows in place of a separate reset_index copy
+        df = df.drop_duplicates(subset=["Заголовок"], keep="first", ignore_index=True)
 
-    problem_ru_col = _detect_column(df, PROBLEM_RU_COL_CANDIDATES)
-    problem_col = _detect_column(df, PROBLEM_COL_CANDIDATES)
+    problem_ru_col = _detect_column(col_set, PROBLEM_RU_COL_CANDIDATES, lower_map)
+    problem_col = _detect_column(col_set, PROBLEM_COL_CANDIDATES, lower_map)
     # Fallback: if base problem column is absent, but RU translation exists, use it as the problem column
     if problem_col is None and problem_ru_col is not None:
         problem_col = problem_ru_col
     if problem_col is None and require_problem:
         raise ValueError("Не найдена колонка с типом проблемы ('проблема'/'problem').")
-    message_col = _detect_column(df, MESSAGE_COL_CANDIDATES)
+    message_col = _detect_column(col_set, MESSAGE_COL_CANDIDATES, lower_map)
     if message_col is None:
         raise ValueError("Не найдена колонка с текстами сообщений ('Сообщение'/'Сообщения').")
 
-    link_col = "Ссылка" if "Ссылка" in df.columns else None
+    link_col = "Ссылка" if "Ссылка" in col_set else None
 
     cols = {
         "problem": problem_col,
@@ -62,3 +142,51 @@ def load_dataset(input_path: str | Path, require_problem: bool = True) -> tuple[
     return df, cols
 
 
+def _csv_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Bool and float columns as the text pandas.to_csv writes for them ('True', '1.0').
+
+    pyarrow would write 'true' and '1'; missing values stay missing (empty cells).
+    Object columns holding only bools (True/False plus blanks read by pandas) are
+    converted too.
+    """
+    out = df
+    for i, dtype in enumerate(df.dtypes):
+        col = df.iloc[:, i]
+        if not (
+            pd.api.types.is_bool_dtype(dtype)
+            or pd.api.types.is_float_dtype(dtype)
+            or (dtype == object and pd.api.types.infer_dtype(col, skipna=True) == "boolean")
+        ):
+            continue
+        if out is df:
+            out = df.copy(deep=False)
+        out.isetitem(i, col.map(str, na_action="ignore"))
+    return out
+
+
+def save_dataset(df: pd.DataFrame, output_path: str | Path) -> None:
+    """Save `df` as ';'-separated UTF-8 CSV with BOM (same format as load_dataset reads).
+
+    Uses pyarrow's multi-threaded CSV writer when available, pandas otherwise.
+    Values are written as pandas writes them (True/False, 1.0); with pyarrow, text
+    values in data rows are always quoted, the header is quoted only where needed.
+    """
+    path = Path(output_path)
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        df.to_csv(path, index=False, encoding="utf-8-sig", sep=";")
+        return
+
+    try:
+        table = pa.Table.from_pandas(_csv_text_columns(df), preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns cannot be converted to Arrow
+        df.to_csv(path, index=False, encoding="utf-8-sig", sep=";")
+        return
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        # Header with minimal quoting, like pandas
+        csv.writer(f, delimiter=";", lineterminator="\n").writerow([str(c) for c in df.columns])
+    with open(path, "ab") as f:
+        pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(delimiter=";", include_header=False))
@@ -1,17 +1,74 @@
 from __future__ import annotations
 
 import os
+import threading
 from typing import Dict, Tuple
-from openai import OpenAI
+
+import httpx
+from openai import APIConnectionError, APITimeoutError, DefaultHttpxClient, InternalServerError, OpenAI, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+
+# Transient API failures worth retrying: 429, 5xx, timeouts, dropped connections.
+# Other 4xx (bad request, auth) would fail again, so they are raised immediately.
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APITimeoutError, APIConnectionError)
+MAX_RETRY_WAIT_S = 60.0
+
+_backoff = wait_random_exponential(min=1, max=MAX_RETRY_WAIT_S)
+
+
+def _wait_retry_after(retry_state) -> float:
+    """Honor the server's Retry-After header when present, else exponential backoff with jitter."""
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return min(float(headers[header]) * scale, MAX_RETRY_WAIT_S)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return _backoff(retry_state)
+
+
+_retry_transient = retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+
+
+_CLIENT: OpenAI | None = None
+_CLIENT_KEY: str | None = None
+_CLIENT_LOCK = threading.Lock()
 
 
 def get_client() -> OpenAI:
+    """Shared client: keeps its connection pool (and TLS sessions) warm across calls and threads.
+
+    A new client is created only if OPENAI_API_KEY changes.
+    """
+    global _CLIENT, _CLIENT_KEY
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is required")
-    return OpenAI(api_key=api_key)
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT_KEY != api_key:
+            _CLIENT = OpenAI(
+                api_key=api_key,
+                # Retries are done by _retry_transient only; SDK retries on top would multiply attempts
+                max_retries=0,
+                # Long non-streamed generations can take minutes: keep the SDK's 600 s read timeout
+                timeout=httpx.Timeout(600.0, connect=10.0),
+                http_client=DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                ),
+            )
+            _CLIENT_KEY = api_key
+        return _CLIENT
 
 
+@_retry_transient
 def chat_complete(model: str, messages: list[dict], temperature: float, max_tokens: int) -> str:
     client = get_client()
     resp = client.chat.completions.create(
@@ -23,36 +80,77 @@ def chat_complete(model: str, messages: list[dict], temperature: float, max_toke
     return resp.choices[0].message.content.strip()
 
 
+def _usage_dict(usage) -> Dict[str, int]:
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+    # Some SDKs expose dict-like usage; ensure ints
+    prompt_tokens = int(getattr(usage, "prompt_tokens", 0))
+    completion_tokens = int(getattr(usage, "completion_tokens", 0))
+    total_tokens = int(getattr(usage, "total_tokens", prompt_tokens + completion_tokens))
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = int(getattr(details, "cached_tokens", 0) or 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens,
+        "cached_tokens": cached_tokens,
+    }
+
+
+@_retry_transient
 def chat_complete_ex(
     model: str,
     messages: list[dict],
     temperature: float,
     max_tokens: int,
+    stream: bool = False,
+    response_format: dict | None = None,
 ) -> Tuple[str, Dict[str, int]]:
     """Same as chat_complete but also returns usage tokens.
 
-    Returns: (content, {prompt_tokens, completion_tokens, total_tokens})
+    With `stream=True` the answer is received as a stream of chunks (usage comes
+    in the last one); useful for long outputs. `response_format` is passed to the
+    API as is, e.g. {"type": "json_object"} for JSON mode.
+
+    Returns: (content, {prompt_tokens, completion_tokens, total_tokens, cached_tokens})
+    `cached_tokens` is the part of prompt_tokens served from OpenAI prompt cache.
     """
     client = get_client()
+    extra = {"response_format": response_format} if response_format else {}
+    if stream:
+        chunks = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **extra,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        parts: list[str] = []
+        usage = None
+        for chunk in chunks:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+        return "".join(parts).strip(), _usage_dict(usage)
+
     resp = client.chat.completions.create(
         model=model,
         messages=messages,
         temperature=temperature,
         max_tokens=max_tokens,
+        **extra,
     )
     content = resp.choices[0].message.content.strip()
-    usage = getattr(resp, "usage", None)
-    if usage is None:
-        usage_dict = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-    else:
-        # Some SDKs expose dict-like usage; ensure ints
-        prompt_tokens = int(getattr(usage, "prompt_tokens", 0))
-        completion_tokens = int(getattr(usage, "completion_tokens", 0))
-        total_tokens = int(getattr(usage, "total_tokens", prompt_tokens + completion_tokens))
-        usage_dict = {
-            "prompt_tokens": prompt_tokens,
-            "completion_tokens": completion_tokens,
-            "total_tokens": total_tokens,
-        }
-    return content, usage_dict
+    return content, _usage_dict(getattr(resp, "usage", None))
+
 
+def add_usage(total: Dict[str, int], usage: Dict[str, int]) -> Dict[str, int]:
+    """Accumulate token counters from `usage` into `total` (in place) and return it."""
+    for key, value in usage.items():
+        total[key] = total.get(key, 0) + int(value or 0)
+    return total
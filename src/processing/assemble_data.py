@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 import re
 
@@ -10,6 +11,54 @@ def _normalize_label(s: object) -> str:
     return str(s).strip().lower()
 
 
+# Group 7.1: ecology/climate/pollution/droughts
+ECOLOGY_SYNONYMS = {
+    "экологические проблемы",
+    "экология",
+    "загрязнение воздуха и воды",
+    "загрязнение воздуха",
+    "загрязнение воды",
+    "изменение климата",
+    "климатические изменения",
+    "засуха",
+    "засухи",
+}
+
+# Group 7.2: power outages & electricity cost
+POWER_SYNONYMS = {
+    "сбои электроснабжения",
+    "перебои с электричеством",
+    "стоимость электроэнергии",
+    "проблемы с электроэнергией (сбои, высокая стоимость, дефицит)",
+    "электроэнергия",
+}
+
+# Group 7.3: housing conditions & high cost/rent
+HOUSING_SYNONYMS = {
+    "жилищные условия",
+    "высокие цены на жильё и аренду",
+    "плохие жилищные условия и высокая стоимость жилья",
+}
+
+# Group 7.4: inflation & high prices for food/fuel
+INFLATION_SYNONYMS = {
+    "инфляция",
+    "инфляция и рост цен",
+    "высокие цены на продукты",
+    "высокие цены на топливо",
+}
+
+MERGED_GROUPS = [
+    ("Экология, климат и загрязнение", ECOLOGY_SYNONYMS),
+    ("Электроэнергия: сбои и высокая стоимость", POWER_SYNONYMS),
+    ("Жильё: условия и высокая стоимость", HOUSING_SYNONYMS),
+    ("Инфляция и рост цен (продукты, топливо)", INFLATION_SYNONYMS),
+]
+
+# normalized synonym -> merged group label (one hash lookup instead of a check per group)
+SYNONYM_TO_GROUP = {syn: group for group, synonyms in MERGED_GROUPS for syn in synonyms}
+
+
 def _merge_key_for_row(base_label: str, ru_label: str | None) -> str:
     """Map raw labels into merged categories per user rules.
 
@@ -20,153 +69,192 @@ def _merge_key_for_row(base_label: str, ru_label: str | None) -> str:
     ru_norm = _normalize_label(ru_label)
     base_norm = _normalize_label(base_label)
 
-    # Group 7.1: ecology/climate/pollution/droughts
-    ecology_synonyms = {
-        "экологические проблемы",
-        "экология",
-        "загрязнение воздуха и воды",
-        "загрязнение воздуха",
-        "загрязнение воды",
-        "изменение климата",
-        "климатические изменения",
-        "засуха",
-        "засухи",
-    }
-    if ru_norm in ecology_synonyms or base_norm in ecology_synonyms:
-        return "Экология, климат и загрязнение"
-
-    # Group 7.2: power outages & electricity cost
-    power_synonyms = {
-        "сбои электроснабжения",
-        "перебои с электричеством",
-        "стоимость электроэнергии",
-        "проблемы с электроэнергией (сбои, высокая стоимость, дефицит)",
-        "электроэнергия",
-    }
-    if ru_norm in power_synonyms or base_norm in power_synonyms:
-        return "Электроэнергия: сбои и высокая стоимость"
-
-    # Group 7.3: housing conditions & high cost/rent
-    housing_synonyms = {
-        "жилищные условия",
-        "высокие цены на жильё и аренду",
-        "плохие жилищные условия и высокая стоимость жилья",
-    }
-    if ru_norm in housing_synonyms or base_norm in housing_synonyms:
-        return "Жильё: условия и высокая стоимость"
-
-    # Group 7.4: inflation & high prices for food/fuel
-    inflation_synonyms = {
-        "инфляция",
-        "инфляция и рост цен",
-        "высокие цены на продукты",
-        "высокие цены на топливо",
-    }
-    if ru_norm in inflation_synonyms or base_norm in inflation_synonyms:
-        return "Инфляция и рост цен (продукты, топливо)"
-
-    # Fallback: original base label
-    return base_label
-
-
-def assemble_problems(df: pd.DataFrame, cols: dict, max_messages: int, max_chars: int) -> tuple[list[str], dict]:
+    # RU synonym, then base synonym; fallback: original base label
+    return SYNONYM_TO_GROUP.get(ru_norm) or SYNONYM_TO_GROUP.get(base_norm) or base_label
+
+
+def _merged_labels(df: pd.DataFrame, cols: dict) -> pd.Series:
+    """Vectorized `_merge_key_for_row` over all rows of `df`.
+
+    Returns a categorical Series (categories in order of first appearance), so
+    counting and grouping work on integer codes instead of label strings.
+    """
     problem_col = cols["problem"]
-    message_col = cols["message"]
     problem_ru_col = cols.get("problem_ru")
-    link_col = cols.get("link")
 
-    # Build merged label per row
-    ru_series = df[problem_ru_col] if (problem_ru_col and problem_ru_col in df.columns) else None
-    merged_labels = df[problem_col].astype(str).copy()
-    if ru_series is not None:
-        merged_labels = [
-            _merge_key_for_row(base_label=str(b), ru_label=str(r))
-            for b, r in zip(df[problem_col].astype(str).tolist(), ru_series.astype(str).tolist())
-        ]
-    else:
-        merged_labels = [
-            _merge_key_for_row(base_label=str(b), ru_label=None)
-            for b in df[problem_col].astype(str).tolist()
-        ]
-
-    counts = pd.Series(merged_labels).value_counts(dropna=True)
-    # Exclude pseudo-label 'нет'
+    # Missing base labels stay "nan", as str() of the raw value gave before
+    base_labels = df[problem_col].astype(str).fillna("nan")
+    merged = base_labels.str.strip().str.lower().map(SYNONYM_TO_GROUP)
+    if problem_ru_col and problem_ru_col in df.columns:
+        ru_norm = df[problem_ru_col].astype(str).str.strip().str.lower()
+        merged = ru_norm.map(SYNONYM_TO_GROUP).fillna(merged)
+    merged = merged.fillna(base_labels)
+
+    codes, uniques = pd.factorize(merged)
+    return pd.Series(pd.Categorical.from_codes(codes, uniques), index=df.index)
+
+
+def _label_counts(merged_labels: pd.Series) -> pd.Series:
+    """Frequency of each merged label (descending), pseudo-label 'нет' excluded."""
+    codes = merged_labels.cat.codes.to_numpy()
+    categories = merged_labels.cat.categories
+    counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(categories)), index=categories)
+    counts = counts.sort_values(ascending=False, kind="stable")
     if 'нет' in counts.index:
         counts = counts[counts.index != 'нет']
-    problems_ordered = list(counts.index)
+    return counts
 
-    def normalize(msg: object) -> str | None:
-        if pd.isna(msg):
-            return None
-        s = str(msg).strip()
-        if len(s) > max_chars:
-            s = s[:max_chars] + "..."
-        return s if s else None
 
-    groups: dict = {}
-    for p in problems_ordered:
-        # Rebuild subset based on merged labels
-        subset_mask = [ml == p for ml in merged_labels]
-        subset = df[subset_mask].copy()
-        subset = subset[~subset[message_col].isna()]
-        if subset.empty:
-            continue
-        messages = (
-            subset[message_col].map(normalize).dropna().tolist()[:max_messages]
-        )
+def _normalize_messages(messages: pd.Series, max_chars: int) -> pd.Series:
+    """Strip messages, cut them to `max_chars` (+ "...") and drop empty ones."""
+    s = messages.dropna().astype(str).str.strip()
+    s = s.where(s.str.len() <= max_chars, s.str.slice(0, max_chars) + "...")
+    return s[s.str.len() > 0]
+
+
+def _str_or_none(value: object) -> str | None:
+    return None if pd.isna(value) else str(value)
+
+
+def _aggregate_groups_pandas(
+    df: pd.DataFrame,
+    cols: dict,
+    merged_labels: pd.Series,
+    first_cols: list[str],
+    max_messages: int,
+    max_chars: int,
+) -> dict:
+    message_col = cols["message"]
+    link_col = cols.get("link")
+
+    # One hash-grouped pass over rows that have a message, instead of a mask per problem
+    has_message = df[message_col].notna()
+    group_keys = merged_labels[has_message]
+    firsts = df.loc[has_message, first_cols].groupby(group_keys, sort=False, observed=True).first() if first_cols else None
+
+    found: dict = {}
+    for p, subset in df[has_message].groupby(group_keys, sort=False, observed=True):
+        messages = _normalize_messages(subset[message_col], max_chars).head(max_messages).tolist()
         if not messages:
             continue
-        # Pick the first non-empty RU translation within the group (not just the first row)
-        if problem_ru_col and problem_ru_col in subset.columns:
-            ru_series = subset[problem_ru_col].dropna()
-            problem_ru = str(ru_series.iloc[0]) if not ru_series.empty else None
-        else:
-            problem_ru = None
         links = []
         if link_col:
             links = (
                 subset[link_col].dropna().astype(str).drop_duplicates().head(3).tolist()
             )
-        # collect labels by language if present in dataset (e.g., problem_en)
-        labels_by_lang: dict = {}
-        for col in df.columns:
-            if col.startswith("problem_") and col.endswith("_candidates") is False:
-                # pick first non-null value for this label within group
-                if col in subset.columns:
-                    val = subset[col].dropna().astype(str)
-                    labels_by_lang[col.split("_", 1)[1]] = str(val.iloc[0]) if not val.empty else None
-
-        groups[p] = {
-            "problem_ru": problem_ru,
+        group_firsts = firsts.loc[p] if firsts is not None else {}
+        found[p] = {
             "messages": messages,
             "links": links,
-            "count": int(counts[p]),
-            "labels_by_lang": labels_by_lang,
+            "firsts": {col: _str_or_none(group_firsts[col]) for col in first_cols},
         }
+    return found
 
-    return problems_ordered, groups
 
+def _aggregate_groups_polars(
+    df: pd.DataFrame,
+    cols: dict,
+    merged_labels: pd.Series,
+    first_cols: list[str],
+    max_messages: int,
+    max_chars: int,
+) -> dict | None:
+    """Same as _aggregate_groups_pandas as one multi-threaded Polars group_by.
 
-def build_distribution(df: pd.DataFrame, cols: dict) -> list[tuple[str, int]]:
-    problem_col = cols["problem"]
+    Returns None if polars is not installed or the columns cannot be converted.
+    """
+    try:
+        import polars as pl
+    except ImportError:
+        return None
+
+    message_col = cols["message"]
+    link_col = cols.get("link")
+    use_cols = list(dict.fromkeys([message_col] + ([link_col] if link_col else []) + first_cols))
+    try:
+        frame = pl.from_pandas(df[use_cols].reset_index(drop=True))
+    except Exception:
+        return None
+    frame = frame.with_columns(pl.Series("_merged", merged_labels.astype(str).tolist()))
+
+    msg = pl.col(message_col).cast(pl.Utf8).str.strip_chars()
+    msg = pl.when(msg.str.len_chars() > max_chars).then(msg.str.slice(0, max_chars) + "...").otherwise(msg)
+    aggs = [msg.filter(msg.str.len_chars() > 0).head(max_messages).alias("_messages")]
+    if link_col:
+        aggs.append(pl.col(link_col).drop_nulls().cast(pl.Utf8).unique(maintain_order=True).head(3).alias("_links"))
+    aggs += [pl.col(c).drop_nulls().first().cast(pl.Utf8).alias(f"_first_{i}") for i, c in enumerate(first_cols)]
+
+    grouped = (
+        frame.lazy()
+        .filter(pl.col(message_col).is_not_null())
+        .group_by("_merged", maintain_order=True)
+        .agg(aggs)
+        .collect()
+    )
+
+    found: dict = {}
+    for row in grouped.iter_rows(named=True):
+        if not row["_messages"]:
+            continue
+        found[row["_merged"]] = {
+            "messages": row["_messages"],
+            "links": row["_links"] if link_col else [],
+            "firsts": {c: row[f"_first_{i}"] for i, c in enumerate(first_cols)},
+        }
+    return found
+
+
+def assemble_problems(df: pd.DataFrame, cols: dict, max_messages: int, max_chars: int) -> tuple[list[str], dict, pd.Series]:
+    """Group messages by merged problem label.
+
+    Returns (problems in frequency order, groups, merged labels per row); pass the
+    latter to build_distribution to avoid recomputing it.
+    """
     problem_ru_col = cols.get("problem_ru")
-    # Compute merged labels for distribution as well
-    ru_series_full = df[problem_ru_col] if (problem_ru_col and problem_ru_col in df.columns) else None
-    merged_labels = df[problem_col].astype(str).copy()
-    if ru_series_full is not None:
-        merged_labels = [
-            _merge_key_for_row(base_label=str(b), ru_label=str(r))
-            for b, r in zip(df[problem_col].astype(str).tolist(), ru_series_full.astype(str).tolist())
-        ]
-    else:
-        merged_labels = [
-            _merge_key_for_row(base_label=str(b), ru_label=None)
-            for b in df[problem_col].astype(str).tolist()
-        ]
-
-    series = pd.Series(merged_labels).value_counts(dropna=True)
-    if 'нет' in series.index:
-        series = series[series.index != 'нет']
+
+    # Build merged label per row
+    merged_labels = _merged_labels(df, cols)
+
+    # Exclude pseudo-label 'нет'
+    counts = _label_counts(merged_labels)
+    problems_ordered = list(counts.index)
+
+    # Label columns by language present in dataset (e.g., problem_en), plus the RU column:
+    # first non-null value per group
+    lang_cols = [c for c in df.columns if c.startswith("problem_") and not c.endswith("_candidates")]
+    has_ru_col = bool(problem_ru_col and problem_ru_col in df.columns)
+    first_cols = list(dict.fromkeys(lang_cols + ([problem_ru_col] if has_ru_col else [])))
+
+    # Polars when available (multi-threaded), pandas otherwise
+    found = _aggregate_groups_polars(df, cols, merged_labels, first_cols, max_messages, max_chars)
+    if found is None:
+        found = _aggregate_groups_pandas(df, cols, merged_labels, first_cols, max_messages, max_chars)
+
+    groups: dict = {}
+    for p in problems_ordered:
+        if p not in found:
+            continue
+        agg = found[p]
+        firsts = agg["firsts"]
+        groups[p] = {
+            # First non-empty RU translation within the group (not just the first row)
+            "problem_ru": firsts[problem_ru_col] if has_ru_col else None,
+            "messages": agg["messages"],
+            "links": agg["links"],
+            "count": int(counts[p]),
+            # collect labels by language if present in dataset (e.g., problem_en)
+            "labels_by_lang": {col.split("_", 1)[1]: firsts[col] for col in lang_cols},
+        }
+
+    return problems_ordered, groups, merged_labels
+
+
+def build_distribution(df: pd.DataFrame, cols: dict, merged_labels: pd.Series | None = None) -> list[tuple[str, int]]:
+    # Compute merged labels for distribution as well, unless assemble_problems already did
+    if merged_labels is None:
+        merged_labels = _merged_labels(df, cols)
+
+    series = _label_counts(merged_labels)
     rows: list[tuple[str, int]] = []
     for merged_label, count in series.items():
         display = str(merged_label)
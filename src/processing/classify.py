@@ -2,17 +2,31 @@ from __future__ import annotations
 
 import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from pathlib import Path
 from typing import Dict, List, Optional
 
 import pandas as pd
 
-from src.models.openai_client import chat_complete_ex
+from src.io.cache import KVCache
+from src.models.openai_client import add_usage, chat_complete_ex
 
 
-def _hash_text(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
+# Bump when the classification prompt/answer format changes to invalidate cached ids
+CLASSIFY_PROMPT_VERSION = "batch-v2"
+
+
+def _cache_key_prefix(problems_ru: List[str], model: str) -> bytes:
+    # Digest of everything a cached answer depends on besides the text; computed once per run
+    prefix = "|".join(problems_ru) + "|" + model + "|" + CLASSIFY_PROMPT_VERSION
+    return hashlib.blake2b(prefix.encode("utf-8"), digest_size=8).digest()
+
+
+def _cache_key(text: str, prefix_digest: bytes) -> str:
+    # Cache key only, no cryptographic need: BLAKE2b with a 64-bit digest (16 hex chars)
+    h = hashlib.blake2b(prefix_digest, digest_size=8)
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
 
 
 def _safe_json_loads(s: str) -> dict:
@@ -28,15 +42,14 @@ def _safe_json_loads(s: str) -> dict:
 @dataclass
 class ClassificationParams:
     max_labels_per_text: int = 3
+    batch_size: int = 16  # texts per classification request
 
 
-def build_classify_prompt(
-    text: str,
+def _problems_reference(
     problems_ru: List[str],
     translations: Dict[str, Dict[str, str]] | None,
     langs: List[str],
-    max_labels: int,
-) -> List[dict]:
+) -> tuple[str, str]:
     problems_block = "\n".join([f"{i}. {name}" for i, name in enumerate(problems_ru, 1)])
     translations_block = ""
     if translations and langs:
@@ -44,27 +57,139 @@ def build_classify_prompt(
         for lang in langs:
             per_lang = [translations.get(ru, {}).get(lang, "") for ru in problems_ru]
             translations_block += f"\n[{lang}]\n" + "\n".join([f"{i}. {t}" for i, t in enumerate(per_lang, 1)])
+    return problems_block, translations_block
+
+
+CLASSIFY_SYSTEM = (
+    "Ты опытный аналитик. Твоя задача — присвоить тексту одну или несколько проблем из заданного списка. "
+    "Выбирать можно ТОЛЬКО из списка (по номерам). Не выдумывай новых меток. Верни только валидный JSON."
+)
 
-    sys = (
-        "Ты опытный аналитик. Твоя задача — присвоить тексту одну или несколько проблем из заданного списка. "
-        "Выбирать можно ТОЛЬКО из списка (по номерам). Не выдумывай новых меток. Верни только валидный JSON."
-    )
-    usr = f"""
-Текст:
-{text}
+
+def build_classify_system(
+    problems_ru: List[str],
+    translations: Dict[str, Dict[str, str]] | None,
+    langs: List[str],
+    max_labels: int,
+) -> str:
+    """System message with everything that does not depend on the texts.
+
+    Built once per run and sent verbatim in every request: the identical prefix
+    lets OpenAI prompt caching reuse it. Only the texts go to the user message.
+    """
+    problems_block, translations_block = _problems_reference(problems_ru, translations, langs)
+    return f"""{CLASSIFY_SYSTEM}
 
 Справочник проблем (RU):
 {problems_block}
 {translations_block}
 
 Требования:
-- Верни до {max_labels} меток (может быть 0) из списка, по убыванию релевантности.
-- Строго JSON без комментариев, формат:
-{{
-  "problem_ids": [1, 3, 5]
-}}
+- Для каждого текста верни до {max_labels} меток (может быть 0) из списка, по убыванию релевантности.
+- Строго JSON без комментариев, в формате из запроса."""
+
+
+def build_classify_prompt(system: str, text: str) -> List[dict]:
+    usr = f"""
+Формат ответа:
+{{"problem_ids": [1, 3, 5]}}
+
+Текст:
+{text}
+"""
+    return [{"role": "system", "content": system}, {"role": "user", "content": usr.strip()}]
+
+
+def build_batch_classify_prompt(system: str, texts: List[str]) -> List[dict]:
+    """Same as build_classify_prompt, but for several numbered texts in one request."""
+    texts_block = "\n\n".join([f"[{i}]\n{t}" for i, t in enumerate(texts, 1)])
+    usr = f"""
+Формат ответа, по одному элементу на каждый текст:
+{{"results": [{{"row": 1, "problem_ids": [1, 3, 5]}}, {{"row": 2, "problem_ids": []}}]}}
+
+Тексты (номер текста в квадратных скобках):
+{texts_block}
 """
-    return [{"role": "system", "content": sys}, {"role": "user", "content": usr.strip()}]
+    return [{"role": "system", "content": system}, {"role": "user", "content": usr.strip()}]
+
+
+def _clean_ids(ids: object, max_labels: int) -> List[int]:
+    if not isinstance(ids, list):
+        return []
+    ids = [int(i) for i in ids if isinstance(i, (int, float))]
+    return ids[:max_labels]
+
+
+def _classify_single(
+    cfg,
+    system: str,
+    text: str,
+    max_labels: int,
+) -> tuple[Optional[List[int]], dict]:
+    msgs = build_classify_prompt(system, text)
+    resp_text, usage = chat_complete_ex(cfg.models.classify, msgs, temperature=0.0, max_tokens=800)
+    try:
+        data = _safe_json_loads(resp_text)
+    except ValueError:
+        return None, usage
+    if not isinstance(data, dict):
+        return None, usage
+    return _clean_ids(data.get("problem_ids", []), max_labels), usage
+
+
+def _classify_batch(
+    cfg,
+    system: str,
+    texts: List[str],
+    max_labels: int,
+) -> tuple[List[Optional[List[int]]], dict]:
+    """Classify several texts with one request.
+
+    Returns ids per text (None if no usable answer was received for it) and token usage.
+    On malformed JSON the batch is split in halves and retried; texts the answer
+    skipped are re-asked one by one. A single text is sent with the single-text
+    prompt and is not asked again if that answer is unusable too.
+    """
+    if len(texts) == 1:
+        ids, usage = _classify_single(cfg, system, texts[0], max_labels)
+        return [ids], usage
+
+    msgs = build_batch_classify_prompt(system, texts)
+    resp_text, usage = chat_complete_ex(
+        cfg.models.classify, msgs, temperature=0.0, max_tokens=800 + 40 * len(texts)
+    )
+    try:
+        data = _safe_json_loads(resp_text)
+        if not isinstance(data, dict):
+            raise ValueError("classification response is not a JSON object")
+    except ValueError:
+        mid = len(texts) // 2
+        left, usage_left = _classify_batch(cfg, system, texts[:mid], max_labels)
+        right, usage_right = _classify_batch(cfg, system, texts[mid:], max_labels)
+        add_usage(usage, usage_left)
+        add_usage(usage, usage_right)
+        return left + right, usage
+
+    by_row: Dict[int, List[int]] = {}
+    results = data.get("results", [])
+    if isinstance(results, list):
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            try:
+                row = int(item.get("row"))
+            except (TypeError, ValueError):
+                continue
+            by_row[row] = _clean_ids(item.get("problem_ids", []), max_labels)
+
+    ids_list: List[Optional[List[int]]] = []
+    for i, text in enumerate(texts, 1):
+        ids = by_row.get(i)
+        if ids is None:
+            ids, usage_single = _classify_single(cfg, system, text, max_labels)
+            add_usage(usage, usage_single)
+        ids_list.append(ids)
+    return ids_list, usage
 
 
 def classify_dataframe(
@@ -76,7 +201,7 @@ def classify_dataframe(
     langs: List[str],
     params: Optional[ClassificationParams] = None,
 ) -> tuple[pd.DataFrame, dict]:
-    usage_total = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    usage_total = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
     if params is None:
         params = ClassificationParams()
 
@@ -87,20 +212,85 @@ def classify_dataframe(
     per_lang_candidates: Dict[str, List[str]] = {lang: [] for lang in langs}
     per_lang_first: Dict[str, List[str]] = {lang: [] for lang in langs}
 
-    cache_dir = Path("cache")
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    cache_file = cache_dir / "classify_cache.json"
-    try:
-        cache = json.loads(cache_file.read_text("utf-8")) if cache_file.exists() else {}
-    except Exception:
-        cache = {}
-
     problems_index_to_ru = {i + 1: ru for i, ru in enumerate(problems_ru)}
 
-    for _, row in df.iterrows():
-        text_raw = str(row[text_col]) if pd.notna(row[text_col]) else ""
-        t = text_raw.strip()
+    # Pass 1: cache keys per row, collect texts not classified yet.
+    # Keyed by cache key, so repeated texts (reposts, templates) are sent once.
+    row_keys: List[Optional[str]] = []
+    misses: Dict[str, str] = {}
+    texts = df[text_col].fillna("").astype(str).str.strip().tolist()
+    key_prefix = _cache_key_prefix(problems_ru, cfg.models.classify)
+    for t in texts:
         if not t:
+            row_keys.append(None)
+            continue
+        key = _cache_key(t, key_prefix)
+        row_keys.append(key)
+        misses.setdefault(key, t)
+
+    with KVCache("classify") as store:
+        known = store.get_many(misses)
+        misses = {key: t for key, t in misses.items() if key not in known}
+
+        # Pass 2: classify unique misses in batches, several batches in flight at once.
+        # Results and usage are merged here, in the calling thread only.
+        batch_size = max(1, params.batch_size)
+        pending = list(misses.items())
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        if batches:
+            system = build_classify_system(problems_ru, translations, langs, params.max_labels_per_text)
+            workers = min(getattr(cfg.models, "classify_concurrency", 0) or 16, len(batches))
+
+            def save(batch, ids_list: List[Optional[List[int]]], usage: dict) -> None:
+                add_usage(usage_total, usage)
+                for (key, _), ids in zip(batch, ids_list):
+                    if ids is not None:
+                        known[key] = ids
+                        store.set(key, ids)
+
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                future_to_batch = {
+                    ex.submit(
+                        _classify_batch,
+                        cfg,
+                        system,
+                        [t for _, t in batch],
+                        params.max_labels_per_text,
+                    ): batch
+                    for batch in batches
+                }
+                not_collected = set(future_to_batch)
+                first_error: Optional[Exception] = None
+                for fut in as_completed(future_to_batch):
+                    not_collected.discard(fut)
+                    try:
+                        save(future_to_batch[fut], *fut.result())
+                    except Exception as e:
+                        first_error = e
+                        break
+                if first_error is not None:
+                    # Queued batches are not started; those already running finish and
+                    # their results still go to the cache before the error is raised
+                    ex.shutdown(wait=False, cancel_futures=True)
+                    for fut in not_collected:
+                        if fut.cancelled():
+                            continue
+                        try:
+                            save(future_to_batch[fut], *fut.result())
+                        except Exception:
+                            continue
+                    raise first_error
+
+    # Pass 3: assemble output columns. Label lookups are precomputed per language,
+    # so each row costs one dict lookup per label and language.
+    ru_by_index = problems_index_to_ru.get
+    translations = translations or {}
+    lang_lookups = {
+        lang: {ru: (translations.get(ru) or {}).get(lang, "") for ru in problems_ru}.get
+        for lang in langs
+    }
+    for key in row_keys:
+        if key is None:
             candidates_ru.append("")
             first_ru.append("")
             for lang in langs:
@@ -108,49 +298,23 @@ def classify_dataframe(
                 per_lang_first[lang].append("")
             continue
 
-        key = _hash_text(t + "|" + "|".join(problems_ru))
-        if key in cache:
-            ids = cache[key]
-        else:
-            msgs = build_classify_prompt(t, problems_ru, translations, langs, params.max_labels_per_text)
-            resp_text, usage = chat_complete_ex(cfg.models.classify, msgs, temperature=0.0, max_tokens=800)
-            data = _safe_json_loads(resp_text)
-            ids = data.get("problem_ids", [])
-            # accumulate tokens
-            usage_total["prompt_tokens"] += usage.get("prompt_tokens", 0)
-            usage_total["completion_tokens"] += usage.get("completion_tokens", 0)
-            usage_total["total_tokens"] += usage.get("total_tokens", 0)
-            if not isinstance(ids, list):
-                ids = []
-            ids = [int(i) for i in ids if isinstance(i, (int, float))]
-            ids = ids[: params.max_labels_per_text]
-            cache[key] = ids
-
-        ru_labels = [problems_index_to_ru.get(i, "") for i in ids if i in problems_index_to_ru]
-        ru_labels = [s for s in ru_labels if s]
+        ids = known.get(key, [])
+        ru_labels = [s for s in map(ru_by_index, ids) if s]
 
         candidates_ru.append("|".join(ru_labels))
         first_ru.append(ru_labels[0] if ru_labels else "")
 
-        for lang in langs:
-            lang_labels = [translations.get(ru, {}).get(lang, "") for ru in ru_labels]
-            lang_labels = [s for s in lang_labels if s]
+        for lang, lookup in lang_lookups.items():
+            lang_labels = [s for s in map(lookup, ru_labels) if s]
             per_lang_candidates[lang].append("|".join(lang_labels))
             per_lang_first[lang].append(lang_labels[0] if lang_labels else "")
 
-    # Save cache
-    try:
-        cache_file.write_text(json.dumps(cache, ensure_ascii=False, indent=2), "utf-8")
-    except Exception:
-        pass
-
-    df_out = df.copy()
-    df_out["problem_russ_candidates"] = candidates_ru
-    df_out["problem_russ"] = first_ru
+    # assign adds the new columns to a shallow copy; existing columns are not copied
+    new_cols = {"problem_russ_candidates": candidates_ru, "problem_russ": first_ru}
     for lang in langs:
-        df_out[f"problem_{lang}_candidates"] = per_lang_candidates[lang]
-        df_out[f"problem_{lang}"] = per_lang_first[lang]
+        new_cols[f"problem_{lang}_candidates"] = per_lang_candidates[lang]
+        new_cols[f"problem_{lang}"] = per_lang_first[lang]
 
-    return df_out, usage_total
+    return df.assign(**new_cols), usage_total
 
 
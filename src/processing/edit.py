@@ -42,7 +42,8 @@ def build_editor_prompt(country: str, raw_section: str, links: list[str]) -> lis
 
 def edit_section(cfg, country: str, raw_section_text: str, links: list[str]) -> tuple[str, dict]:
     messages = build_editor_prompt(country, raw_section_text, links)
-    content, usage = chat_complete_ex(cfg.models.editor, messages, cfg.temperature, cfg.max_tokens)
+    # Editor output is long: stream it instead of waiting for one big response
+    content, usage = chat_complete_ex(cfg.models.editor, messages, cfg.temperature, cfg.max_tokens, stream=True)
     return content, usage
 
 
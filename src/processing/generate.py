@@ -14,12 +14,9 @@ def build_section_prompt(country: str, problem_key: str, problem_ru: str | None,
         "Строгое требование: примеры и цитаты должны относиться к целевой стране; упоминания других стран допустимы только как внешний контекст, но НЕЛЬЗЯ менять принадлежность события/участников. "
         "Если пример/цитата не относится к целевой стране — пропусти его/её."
     )
-    usr = f"""
-Тип проблемы: {problem_title}
-
-Высказывания (до {max_messages} шт):
-{msgs_block}
-
+    # Everything that does not depend on the problem goes into the system message so
+    # the prompt prefix is identical across sections (OpenAI prompt caching).
+    rubric = f"""
 Задача:
 1) Дай 3-5 конкретных примера с понятным контекстом: где/когда/кто/что произошло. (Если примеров меньше 3, то дай столько, сколько есть.)
 2) Акцент на проблемах рядовых жителей {country}. Краткость приветствуется: раскрывай тему через примеры.
@@ -41,7 +38,13 @@ def build_section_prompt(country: str, problem_key: str, problem_ru: str | None,
 - Избегай повторов между «Описание проблемы/Пример/Цитата». Детали — только в примерах. Если цитата повторяет «что произошло», выбери другую.
 - Не добавляй заголовок «Анализ». Вкладывай анализ (1–2 предложения) внутрь каждого примера.
 """
-    return [{"role": "system", "content": sys}, {"role": "user", "content": usr.strip()}]
+    usr = f"""
+Тип проблемы: {problem_title}
+
+Высказывания (до {max_messages} шт):
+{msgs_block}
+"""
+    return [{"role": "system", "content": sys + "\n\n" + rubric.strip()}, {"role": "user", "content": usr.strip()}]
 
 
 def generate_section(cfg, country: str, problem_key: str, group: dict) -> tuple[str, dict]:
@@ -2,43 +2,52 @@ from __future__ import annotations
 
 from typing import List
 
+import numpy as np
 import pandas as pd
 
 
+def _one_hot(candidates: pd.Series, labels: List[str] | None = None) -> pd.DataFrame:
+    """Bool column per label: is it among the row's '|'-separated candidates.
+
+    Every row is split into a set once and its labels are scattered into a bool
+    matrix. Without `labels`, the labels present in the data are used (sorted).
+    """
+    # Missing values (NaN/None/NA) are not strings and give an empty set, so the
+    # column needs no fillna/astype pass of its own
+    row_sets = [set(s.split("|")) if isinstance(s, str) and s else set() for s in candidates.tolist()]
+    if labels is None:
+        # rows without candidates may show up as an empty label
+        labels = sorted(set().union(*row_sets) - {""})
+    col_of = {lbl: j for j, lbl in enumerate(labels)}
+    rows, cols = [], []
+    for i, rs in enumerate(row_sets):
+        for lbl in rs:
+            j = col_of.get(lbl)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+    mat = np.zeros((len(row_sets), len(labels)), dtype=bool)
+    mat[rows, cols] = True
+    return pd.DataFrame(mat, index=candidates.index, columns=labels)
+
+
 def add_wide_columns(
     df: pd.DataFrame,
     problems_ru: List[str],
     langs: List[str],
     ru_candidates_col: str = "problem_russ_candidates",
 ) -> pd.DataFrame:
-    df_out = df.copy()
+    # Wide columns are built as whole blocks and attached in one concat; the input
+    # frame is not modified, so it is not copied up front
+    ru_labels = list(dict.fromkeys(problems_ru))
+    wide_blocks = [_one_hot(df[ru_candidates_col], ru_labels).add_prefix("ru_")]
 
-    # RU wide
-    for ru in problems_ru:
-        col = f"ru_{ru}"
-        df_out[col] = df_out[ru_candidates_col].astype(str).apply(
-            lambda s: str(ru) in s.split("|") if s else False
-        )
-
-    # per language wide columns (based on candidates too)
+    # per language wide columns (based on candidates too); labels are the ones
+    # present in the dataset, to avoid redundant columns
     for lang in langs:
         cand_col = f"problem_{lang}_candidates"
-        # Gather known labels for this lang from existing translations in the dataset
-        # We'll derive from translated first/unique values to avoid redundant columns
-        unique_labels = sorted(
-            set(
-                l
-                for v in df_out[cand_col].dropna().astype(str).tolist()
-                for l in v.split("|")
-                if l
-            )
-        )
-        for lbl in unique_labels:
-            col = f"{lang}_{lbl}"
-            df_out[col] = df_out[cand_col].astype(str).apply(
-                lambda s, label=lbl: label in s.split("|") if s else False
-            )
-
-    return df_out
-
+        wide_blocks.append(_one_hot(df[cand_col]).add_prefix(f"{lang}_"))
 
+    new_cols = [c for block in wide_blocks for c in block.columns]
+    df_out = df.drop(columns=[c for c in new_cols if c in df.columns])
+    return pd.concat([df_out, *wide_blocks], axis=1)
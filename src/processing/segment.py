@@ -4,36 +4,34 @@ import re
 from typing import List, Dict
 
 
-HEADING_PATTERNS = [
-    re.compile(r"^Описание проблемы\s*:?$", re.IGNORECASE),
-    re.compile(r"^Пример\s+\d+\s*:?$", re.IGNORECASE),
-    re.compile(r"^Цитаты\s*:?$", re.IGNORECASE),
-    re.compile(r"^Источники\s*:?$", re.IGNORECASE),
-]
+# All section headings in one alternation: a single match call per line
+_HEADING_RE = re.compile(r"^(?:Описание проблемы|Пример\s+\d+|Цитаты|Источники)\s*:?$", re.IGNORECASE)
+# Closing parenthesis at the end of a line (translation in parentheses)
+_QUOTE_TAIL_RE = re.compile(r"\)\s*$")
+_BULLET_PREFIX = ("- ", "— ", "• ")
+_QUOTE_OPENERS = frozenset('"«“„\'‚')
 
 
-def _is_heading(line: str) -> bool:
-    s = line.strip()
-    return any(p.match(s) for p in HEADING_PATTERNS)
+# Line checks below take an already stripped, non-empty line
 
 
-def _is_link(line: str) -> bool:
-    s = line.strip()
-    return s.startswith("http://") or s.startswith("https://")
+def _is_heading(s: str) -> bool:
+    return _HEADING_RE.match(s) is not None
 
 
-def _is_quote(line: str) -> bool:
-    s = line.strip()
-    if not s:
-        return False
+def _is_link(s: str) -> bool:
+    return s.startswith(("http://", "https://"))
+
+
+def _is_quote(s: str) -> bool:
     # bullets as quotes
-    if s.startswith("- ") or s.startswith("— ") or s.startswith("• "):
+    if s.startswith(_BULLET_PREFIX):
         return True
     # text enclosed in quotes
-    if s[0] in {'"', '«', '“', '„', "'", '‚'}:
+    if s[0] in _QUOTE_OPENERS:
         return True
     # heuristic: contains translation in parentheses at end
-    if re.search(r"\)\s*$", s) and ("(" in s):
+    if _QUOTE_TAIL_RE.search(s) and ("(" in s):
         return True
     return False
 
@@ -47,7 +45,6 @@ def parse_editor_output(text: str) -> List[Dict[str, str | list]]:
     if not text or not text.strip():
         return blocks
 
-    lines = [ln.rstrip() for ln in text.splitlines()]
     current_section = None  # quotes | sources | other
 
     sources_acc: list[str] = []
@@ -58,23 +55,25 @@ def parse_editor_output(text: str) -> List[Dict[str, str | list]]:
             blocks.append({"type": "sources", "items": sources_acc})
             sources_acc = []
 
-    for line in lines:
-        if not line.strip():
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
             continue
-        if _is_heading(line):
+        if _is_heading(stripped):
             flush_sources()
-            blocks.append({"type": "subheading", "text": line.strip()})
-            if line.strip().lower().startswith("цитаты"):
+            blocks.append({"type": "subheading", "text": stripped})
+            heading = stripped.lower()
+            if heading.startswith("цитаты"):
                 current_section = "quotes"
-            elif line.strip().lower().startswith("источники"):
+            elif heading.startswith("источники"):
                 current_section = "sources"
             else:
                 current_section = None
             continue
 
         if current_section == "sources":
-            if _is_link(line):
-                sources_acc.append(line.strip())
+            if _is_link(stripped):
+                sources_acc.append(stripped)
             else:
                 # If non-link text appears under Sources, drop it silently
                 # and end the Sources section without adding explanations.
@@ -82,18 +81,16 @@ def parse_editor_output(text: str) -> List[Dict[str, str | list]]:
                 current_section = None
             continue
 
-        if current_section == "quotes" or _is_quote(line):
+        if current_section == "quotes" or _is_quote(stripped):
             flush_sources()
-            # Normalize bullet prefix
-            s = line.strip()
-            if s.startswith("- ") or s.startswith("— ") or s.startswith("• "):
-                s = s[2:].strip()
+            # Normalize bullet prefix (all prefixes are two characters long)
+            s = stripped[2:].lstrip() if stripped.startswith(_BULLET_PREFIX) else stripped
             blocks.append({"type": "quote", "text": s})
             continue
 
         # Fallback paragraph
         flush_sources()
-        blocks.append({"type": "paragraph", "text": line})
+        blocks.append({"type": "paragraph", "text": line.rstrip()})
 
     # End cleanup
     flush_sources()
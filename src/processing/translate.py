@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import json
 from typing import Dict, List
 
-from src.models.openai_client import chat_complete_ex
+from src.io.cache import KVCache
+from src.models.openai_client import add_usage, chat_complete_ex
 
 
 def _safe_json_loads(s: str) -> dict:
@@ -18,52 +20,133 @@ def _safe_json_loads(s: str) -> dict:
     return json.loads(s)
 
 
-def translate_problems(
-    cfg,
-    problems_ru: List[str],
-    langs: List[str],
-) -> tuple[Dict[str, Dict[str, str]], dict]:
-    """Translate a list of RU problems into specified languages.
+# Max number of RU labels sent in a single translation request
+TRANSLATE_CHUNK_SIZE = 50
+# Rough answer size per translated label (text plus JSON framing), for max_tokens
+TRANSLATE_TOKENS_PER_LABEL = 20
 
-    Returns mapping: ru_label -> { lang: translation }
-    """
 
-    # Build a single prompt to translate the entire list per language
+def build_translate_prompt(problems_ru: List[str], langs: List[str]) -> List[dict]:
     numbered = "\n".join([f"{i}. {name}" for i, name in enumerate(problems_ru, 1)])
     languages_str = ", ".join(langs)
     sys = (
         "Ты профессиональный переводчик. Переводи краткие словосочетания проблем строго по смыслу, без добавления новых слов. "
         "Верни только валидный JSON без комментариев."
     )
+    # Static instructions first, the numbered list last: keeps the prompt prefix
+    # identical across chunks so OpenAI prompt caching can reuse it.
     usr = f"""
-Исходные формулировки (RU), по одной на строку, с номерами:
-{numbered}
-
-Языки перевода (ISO 639-1): {languages_str}
-
 Требования:
-- Для каждого языка верни список переводов в том же порядке, что и входной список.
+- Для каждого языка верни переводы с теми же номерами, что и во входном списке.
 - Формат ответа (JSON):
 {{
   "translations": {{
-    "<lang1>": ["...", "..."],
-    "<lang2>": ["...", "..."]
+    "<lang1>": {{"1": "...", "2": "..."}},
+    "<lang2>": {{"1": "...", "2": "..."}}
   }}
 }}
+
+Языки перевода (ISO 639-1): {languages_str}
+
+Исходные формулировки (RU), по одной на строку, с номерами:
+{numbered}
 """
+    return [{"role": "system", "content": sys}, {"role": "user", "content": usr.strip()}]
 
-    messages = [{"role": "system", "content": sys}, {"role": "user", "content": usr.strip()}]
-    resp_text, usage = chat_complete_ex(cfg.models.classify, messages, temperature=0.0, max_tokens=2000)
-    data = _safe_json_loads(resp_text)
-    translations = data.get("translations", {})
 
-    # Build mapping ru -> {lang: translation}
+def _by_index(values: object, n: int) -> Dict[int, str]:
+    """Normalize a per-language answer ({"1": ...} or [...]) into {index: translation}."""
+    if isinstance(values, dict):
+        out: Dict[int, str] = {}
+        for k, v in values.items():
+            try:
+                out[int(k)] = str(v).strip()
+            except (TypeError, ValueError):
+                continue
+        return out
+    if isinstance(values, list):
+        return {i: str(v).strip() for i, v in enumerate(values[:n], 1)}
+    return {}
+
+
+def _translate_chunk(cfg, problems_ru: List[str], langs: List[str]) -> tuple[Dict[str, Dict[str, str]], dict]:
+    messages = build_translate_prompt(problems_ru, langs)
+    # Room for every label in every language, so long lists are not cut off
+    max_tokens = max(800, int(len(problems_ru) * len(langs) * TRANSLATE_TOKENS_PER_LABEL * 1.5))
+    resp_text, usage = chat_complete_ex(
+        cfg.models.classify,
+        messages,
+        temperature=0.0,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},
+    )
+    try:
+        data = _safe_json_loads(resp_text)
+        if not isinstance(data, dict):
+            raise ValueError("translation response is not a JSON object")
+    except ValueError:
+        data = {}
+
+    translations = data.get("translations", {})
+    if not isinstance(translations, dict):
+        translations = {}
     result: Dict[str, Dict[str, str]] = {ru: {} for ru in problems_ru}
     for lang in langs:
-        arr = translations.get(lang, [])
-        for idx, ru in enumerate(problems_ru):
-            if idx < len(arr):
-                result[ru][lang] = str(arr[idx]).strip()
+        by_index = _by_index(translations.get(lang), len(problems_ru))
+        for idx, ru in enumerate(problems_ru, 1):
+            if idx in by_index:
+                result[ru][lang] = by_index[idx]
+
+    # Malformed, truncated or short answer: ask again for the missing labels in
+    # halves. A single label is never split further and stays as it is.
+    missing = [ru for ru in problems_ru if len(result[ru]) < len(langs)]
+    if missing and len(problems_ru) > 1:
+        mid = (len(missing) + 1) // 2
+        for part in (missing[:mid], missing[mid:]):
+            if not part:
+                continue
+            part_result, part_usage = _translate_chunk(cfg, part, langs)
+            add_usage(usage, part_usage)
+            for ru, per_lang in part_result.items():
+                result[ru].update(per_lang)
     return result, usage
 
 
+def _translation_cache_key(model: str, problems_ru: List[str], langs: List[str]) -> str:
+    key_src = "|".join(problems_ru) + "||" + ",".join(sorted(langs)) + "|" + model
+    return hashlib.blake2b(key_src.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def translate_problems(
+    cfg,
+    problems_ru: List[str],
+    langs: List[str],
+) -> tuple[Dict[str, Dict[str, str]], dict]:
+    """Translate a list of RU problems into specified languages.
+
+    All languages are requested at once; the list is sent in chunks of
+    TRANSLATE_CHUNK_SIZE numbered items, answers are mapped back by index.
+    Complete results are cached in the shared sqlite store (namespace "translate")
+    by (problems, langs, model); a cache hit costs no tokens.
+
+    Returns mapping: ru_label -> { lang: translation }
+    """
+    usage_total = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+    cache_key = _translation_cache_key(cfg.models.classify, problems_ru, langs)
+    with KVCache("translate") as store:
+        cached = store.get(cache_key)
+    if cached is not None:
+        return cached, usage_total
+
+    result: Dict[str, Dict[str, str]] = {}
+    for start in range(0, len(problems_ru), TRANSLATE_CHUNK_SIZE):
+        chunk = problems_ru[start:start + TRANSLATE_CHUNK_SIZE]
+        chunk_result, usage = _translate_chunk(cfg, chunk, langs)
+        result.update(chunk_result)
+        add_usage(usage_total, usage)
+
+    # Do not cache partial answers, so missing labels get another try next run
+    if all(lang in result.get(ru, {}) for ru in problems_ru for lang in langs):
+        with KVCache("translate") as store:
+            store.set(cache_key, result)
+    return result, usage_total
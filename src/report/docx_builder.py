@@ -1,3 +1,4 @@
+from copy import deepcopy
 from datetime import datetime
 import re
 from docx import Document
@@ -25,28 +26,26 @@ def add_word_toc(doc: Document) -> None:
     r._r.append(fld_end)
 
 
-def add_page_numbers(doc: Document, skip_first: bool = True) -> None:
-    from docx.oxml import OxmlElement
-    for i, section in enumerate(doc.sections):
-        if skip_first and i == 0:
-            continue
-        footer = section.footer
-        # Add page number into its own paragraph to avoid clearing other footer content
-        p = footer.add_paragraph()
-        p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        run = p.add_run()
-        fldChar1 = OxmlElement('w:fldChar')
-        fldChar1.set(qn('w:fldCharType'), 'begin')
-        instrText = OxmlElement('w:instrText')
-        instrText.text = 'PAGE'
-        fldChar2 = OxmlElement('w:fldChar')
-        fldChar2.set(qn('w:fldCharType'), 'end')
-        run._r.append(fldChar1)
-        run._r.append(instrText)
-        run._r.append(fldChar2)
-
-
-def add_header(doc: Document, header_text: str, skip_first: bool = True) -> None:
+def _page_field_run():
+    run = OxmlElement('w:r')
+    fld_begin = OxmlElement('w:fldChar')
+    fld_begin.set(qn('w:fldCharType'), 'begin')
+    instr = OxmlElement('w:instrText')
+    instr.text = 'PAGE'
+    fld_end = OxmlElement('w:fldChar')
+    fld_end.set(qn('w:fldCharType'), 'end')
+    run.append(fld_begin)
+    run.append(instr)
+    run.append(fld_end)
+    return run
+
+
+# Run with a PAGE field; deep-copied into every decorated footer
+_PAGE_FIELD_TEMPLATE = _page_field_run()
+
+
+def _decorate_sections(doc: Document, header_text: str, date_text: str, skip_first: bool = True) -> None:
+    """Header text, footer date and page number for every section, in one pass."""
     for i, section in enumerate(doc.sections):
         if skip_first and i == 0:
             continue
@@ -58,67 +57,107 @@ def add_header(doc: Document, header_text: str, skip_first: bool = True) -> None
             run.font.size = Pt(10)
             run.font.italic = True
 
-
-def add_footer_date(doc: Document, date_text: str, skip_first: bool = True) -> None:
-    for i, section in enumerate(doc.sections):
-        if skip_first and i == 0:
-            continue
         footer = section.footer
         p = footer.add_paragraph()
         p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
         r = p.add_run(date_text)
         r.font.size = Pt(10)
         r.italic = True
-
-
-def format_quote_paragraph(p) -> None:
-    p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-    p.paragraph_format.space_before = Pt(6)
-    p.paragraph_format.space_after = Pt(6)
-    for r in p.runs:
-        r.font.italic = True
-        r.font.size = Pt(10)
+        # Page number goes into its own paragraph to avoid clearing other footer content
+        p = footer.add_paragraph()
+        p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        p._p.append(deepcopy(_PAGE_FIELD_TEMPLATE))
+
+
+# Quote look: italic 10pt, 6pt spacing before and after (values in OOXML units)
+_QUOTE_SIZE_HALF_PT = "20"
+_QUOTE_SPACING_TWIPS = "120"
+# Characters that python-docx turns into <w:tab/> / <w:br/> inside a run
+_RUN_SPECIAL_RE = re.compile(r"([\t\n\r])")
+
+
+def _mk_run(text: str, quote: bool = False):
+    r = OxmlElement('w:r')
+    if quote:
+        rpr = OxmlElement('w:rPr')
+        rpr.append(OxmlElement('w:i'))
+        sz = OxmlElement('w:sz')
+        sz.set(qn('w:val'), _QUOTE_SIZE_HALF_PT)
+        rpr.append(sz)
+        r.append(rpr)
+    for piece in _RUN_SPECIAL_RE.split(text):
+        if not piece:
+            continue
+        if piece == "\t":
+            r.append(OxmlElement('w:tab'))
+        elif piece in ("\n", "\r"):
+            r.append(OxmlElement('w:br'))
+        else:
+            t = OxmlElement('w:t')
+            t.text = piece
+            if len(piece.strip()) < len(piece):
+                t.set(qn('xml:space'), 'preserve')
+            r.append(t)
+    return r
+
+
+def _mk_paragraph(text: str, style_id: str | None = None, jc: str | None = None, quote: bool = False):
+    """Build a <w:p> element directly, without python-docx's paragraph/run objects.
+
+    The XML is the same as from add_paragraph/add_heading plus the alignment
+    and quote formatting setters, with `style_id` being the style's XML id.
+    """
+    p = OxmlElement('w:p')
+    if style_id or jc or quote:
+        ppr = OxmlElement('w:pPr')
+        if style_id:
+            pstyle = OxmlElement('w:pStyle')
+            pstyle.set(qn('w:val'), style_id)
+            ppr.append(pstyle)
+        if quote:
+            spacing = OxmlElement('w:spacing')
+            spacing.set(qn('w:before'), _QUOTE_SPACING_TWIPS)
+            spacing.set(qn('w:after'), _QUOTE_SPACING_TWIPS)
+            ppr.append(spacing)
+        if jc:
+            jc_el = OxmlElement('w:jc')
+            jc_el.set(qn('w:val'), jc)
+            ppr.append(jc_el)
+        p.append(ppr)
+    if text:
+        p.append(_mk_run(text, quote=quote))
+    return p
+
+
+# (style name, size relative to body text, alignment, bold or None to keep as is):
+# body justified, headings centered and bold, title page heading larger still
+_STYLE_SPECS = (
+    ("Normal", 0, WD_PARAGRAPH_ALIGNMENT.JUSTIFY, None),
+    ("Heading 1", 2, WD_PARAGRAPH_ALIGNMENT.CENTER, True),
+    ("Heading 2", 2, WD_PARAGRAPH_ALIGNMENT.CENTER, True),
+    ("Title", 4, WD_PARAGRAPH_ALIGNMENT.CENTER, True),
+)
 
 
 def _setup_styles(doc: Document, base_font_size_pt: int = 12) -> None:
-    # Normal paragraphs: justify
-    try:
-        normal = doc.styles["Normal"]
-        normal.font.size = Pt(base_font_size_pt)
-        normal.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.JUSTIFY
-    except Exception:
-        pass
-
-    # Headings: center, bold, +2pt relative to body
-    for style_name in ["Heading 1", "Heading 2"]:
+    styles = doc.styles
+    for style_name, size_delta, alignment, bold in _STYLE_SPECS:
         try:
-            st = doc.styles[style_name]
-            st.font.bold = True
-            st.font.size = Pt(base_font_size_pt + 2)
-            st.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        except Exception:
+            st = styles[style_name]
+        except KeyError:
             continue
-
-    # Title page heading
-    try:
-        title_style = doc.styles["Title"]
-        title_style.font.bold = True
-        title_style.font.size = Pt(base_font_size_pt + 4)
-        title_style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    except Exception:
-        pass
+        font = st.font
+        if bold is not None:
+            font.bold = bold
+        font.size = Pt(base_font_size_pt + size_delta)
+        st.paragraph_format.alignment = alignment
 
 
-BANNED_PATTERNS = [
-    re.compile(r"\bлгбт\+?\b", re.IGNORECASE),
-    re.compile(r"\blgbt\w*\b", re.IGNORECASE),
-]
+_BANNED_RE = re.compile(r"\bлгбт\+?\b|\blgbt\w*\b", re.IGNORECASE)
 
 
 def _contains_banned(text: str | None) -> bool:
-    if not text:
-        return False
-    return any(p.search(text) for p in BANNED_PATTERNS)
+    return bool(text) and _BANNED_RE.search(text) is not None
 
 
 def build_document(country: str, title: str, sections: list, distribution_table: list | None = None) -> Document:
@@ -167,6 +206,8 @@ def build_document(country: str, title: str, sections: list, distribution_table:
             r[1].text = str(row[1])
 
     # Sections
+    heading2_id = doc.styles["Heading 2"].style_id
+    add_block = doc.element.body.sectPr.addprevious
     for section in sections:
         title_text = section.get("title")
         if _contains_banned(title_text):
@@ -186,7 +227,7 @@ def build_document(country: str, title: str, sections: list, distribution_table:
                     continue
                 filtered_blocks.append(block)
             elif btype == "sources":
-                items = [str(u) for u in block.get("items", []) if not _contains_banned(str(u))]
+                items = [u for u in map(str, block.get("items", [])) if not _BANNED_RE.search(u)]
                 if items:
                     filtered_blocks.append({"type": "sources", "items": items})
 
@@ -195,26 +236,28 @@ def build_document(country: str, title: str, sections: list, distribution_table:
             continue
 
         doc.add_heading(title_text, level=1)  # Heading 1
+        # Section content is built as raw XML and inserted before the body's sectPr,
+        # which is where add_paragraph would put it
         for block in filtered_blocks:
             if block["type"] == "subheading":
-                doc.add_heading(block["text"], level=2)  # Heading 2
+                add_block(_mk_paragraph(block["text"], style_id=heading2_id))
             elif block["type"] == "paragraph":
-                p = doc.add_paragraph(block["text"])  # Normal
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.JUSTIFY
+                add_block(_mk_paragraph(block["text"], jc="both"))
             elif block["type"] == "quote":
-                qp = doc.add_paragraph(block["text"])  # Normal then format
-                format_quote_paragraph(qp)
+                add_block(_mk_paragraph(block["text"], jc="left", quote=True))
             elif block["type"] == "sources":
                 items = block.get("items", [])
                 if items:
-                    doc.add_heading("Источники", level=2)
+                    add_block(_mk_paragraph("Источники", style_id=heading2_id))
                     for url in items:
-                        p = doc.add_paragraph(str(url))
-                        p.alignment = WD_PARAGRAPH_ALIGNMENT.JUSTIFY
+                        add_block(_mk_paragraph(str(url), jc="both"))
 
-    add_header(doc, "Проблемное поле жителей {0}: тематический анализ на основании материалов социальных сетей и электронных медиа".format(translate_country_ru(country)), skip_first=True)
-    add_footer_date(doc, f"Дата создания отчёта: {created_date}", skip_first=True)
-    add_page_numbers(doc, skip_first=True)
+    _decorate_sections(
+        doc,
+        "Проблемное поле жителей {0}: тематический анализ на основании материалов социальных сетей и электронных медиа".format(translate_country_ru(country)),
+        f"Дата создания отчёта: {created_date}",
+        skip_first=True,
+    )
     return doc
 
 